@@ -0,0 +1,80 @@
+from litex.gen import *
+from litex.gen.genlib.cdc import PulseSynchronizer
+from litex.gen.genlib.misc import WaitTimer
+
+from litex.soc.interconnect import wishbone
+
+
+# Forwards single accesses from cd_master to cd_slave. The master holds
+# adr/dat_w/sel/we stable until ack, so only the request and acknowledge
+# pulses need to cross domains. An access the slave does not ack within
+# timeout cd_slave cycles is terminated so it cannot lock up the bus.
+class WishboneCDC(Module):
+    def __init__(self, cd_master="sys", cd_slave="sys", master=None, slave=None,
+                 timeout=1024):
+        if master is None:
+            master = wishbone.Interface()
+        if slave is None:
+            slave = wishbone.Interface()
+        self.master = master
+        self.slave = slave
+
+        # # #
+
+        start = PulseSynchronizer(cd_master, cd_slave)
+        done = PulseSynchronizer(cd_slave, cd_master)
+        self.submodules += start, done
+
+        # master side
+        pending = Signal()
+        aborted = Signal()
+        request = Signal()
+        self.comb += [
+            request.eq(master.cyc & master.stb & ~pending & ~master.ack),
+            start.i.eq(request)
+        ]
+        sync_master = getattr(self.sync, cd_master)
+        sync_master += [
+            master.ack.eq(0),
+            If(request,
+                pending.eq(1)
+            ),
+            # master gave up (e.g. bridge timeout): swallow the late ack
+            If(pending & ~master.cyc,
+                aborted.eq(1)
+            ),
+            If(done.o,
+                pending.eq(0),
+                aborted.eq(0),
+                master.ack.eq(master.cyc & ~aborted)
+            )
+        ]
+
+        # slave side
+        timer = ClockDomainsRenamer(cd_slave)(WaitTimer(timeout))
+        self.submodules += timer
+        end = Signal()
+        dat_r = Signal(len(master.dat_r))
+        self.comb += [
+            timer.wait.eq(slave.stb),
+            end.eq(slave.ack | timer.done),
+            done.i.eq(slave.stb & end),
+            master.dat_r.eq(dat_r)
+        ]
+        sync_slave = getattr(self.sync, cd_slave)
+        sync_slave += [
+            If(start.o,
+                slave.cyc.eq(1),
+                slave.stb.eq(1),
+                slave.adr.eq(master.adr),
+                slave.dat_w.eq(master.dat_w),
+                slave.sel.eq(master.sel),
+                slave.we.eq(master.we)
+            ),
+            # release the bus if the slave never acks
+            If(slave.stb & end,
+                slave.cyc.eq(0),
+                slave.stb.eq(0),
+                dat_r.eq(slave.dat_r)
+            )
+        ]
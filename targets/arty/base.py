@@ -18,13 +18,9 @@ from litex.soc.interconnect.stream import *
 from litedram.modules import MT41K128M16
 from litedram.phy import a7ddrphy
 from litedram.core.controller import ControllerSettings
-from litedram.frontend.bist import LiteDRAMBISTGenerator
-from litedram.frontend.bist import LiteDRAMBISTChecker
-
-from liteeth.phy import LiteEthPHY
-from liteeth.core.mac import LiteEthMAC
 
 from gateware import dna, xadc, led
+from gateware.wishbone_cdc import WishboneCDC
 
 
 class UARTVirtualPhy:
@@ -34,16 +30,13 @@ class UARTVirtualPhy:
 
 
 class _CRG(Module):
-    def __init__(self, platform):
+    def __init__(self, clk100, rst, eth_ref_clk):
         self.clock_domains.cd_sys = ClockDomain()
         self.clock_domains.cd_sys4x = ClockDomain(reset_less=True)
         self.clock_domains.cd_sys4x_dqs = ClockDomain(reset_less=True)
         self.clock_domains.cd_clk200 = ClockDomain()
         self.clock_domains.cd_clk50 = ClockDomain()
 
-        clk100 = platform.request("clk100")
-        rst = platform.request("cpu_reset")
-
         pll_locked = Signal()
         pll_fb = Signal()
         self.pll_sys = Signal()
@@ -89,27 +82,33 @@ class _CRG(Module):
             AsyncResetSynchronizer(self.cd_clk200, ~pll_locked | rst),
             AsyncResetSynchronizer(self.cd_clk50, ~pll_locked | ~rst),
         ]
-
-        reset_counter = Signal(4, reset=15)
+        # sys4x/sys4x_dqs are 90 degrees apart and both drive OSERDES across
+        # several banks, so they each need a BUFG (a BUFIO only reaches one bank)
+        self.cd_sys4x.clk.attr.add("keep")
+        self.cd_sys4x_dqs.clk.attr.add("keep")
+
+        # reset_less so it maps to an SRL16E: ones are shifted in while clk200
+        # is held in reset (PLL lock, cpu_reset), so IDELAYCTRL stays in reset
+        # for 16 cycles after every reset release
+        ic_reset_sr = Signal(16, reset=0xffff, reset_less=True)
         ic_reset = Signal(reset=1)
-        self.sync.clk200 += \
-            If(reset_counter != 0,
-                reset_counter.eq(reset_counter - 1)
-            ).Else(
-                ic_reset.eq(0)
-            )
+        self.sync.clk200 += [
+            ic_reset_sr.eq(Cat(ResetSignal("clk200"), ic_reset_sr[:-1])),
+            ic_reset.eq(ic_reset_sr[-1])
+        ]
         self.specials += Instance("IDELAYCTRL", i_REFCLK=ClockSignal("clk200"), i_RST=ic_reset)
 
         eth_clk = Signal()
         self.specials += [
             Instance("BUFR", p_BUFR_DIVIDE="4", i_CE=1, i_CLR=0, i_I=clk100, o_O=eth_clk),
-            Instance("BUFG", i_I=eth_clk, o_O=platform.request("eth_ref_clk")),
+            Instance("BUFG", i_I=eth_clk, o_O=eth_ref_clk),
         ]
 
 class BaseSoC(SoCSDRAM):
     default_platform = "arty"
 
     csr_map = {
+        **SoCSDRAM.csr_map,
         "spiflash":  16,
         "ddrphy":    17,
         "dna":       18,
@@ -119,44 +118,69 @@ class BaseSoC(SoCSDRAM):
         "generator": 22,
         "checker":   23
     }
-    csr_map.update(SoCSDRAM.csr_map)
 
     mem_map = {
+        **SoCSDRAM.mem_map,
         "spiflash": 0x20000000,  # (default shadow @0xa0000000)
     }
-    mem_map.update(SoCSDRAM.mem_map)
 
     def __init__(self,
                  platform,
-                 with_sdram_bist=True, bist_async=True, bist_random=True,
-                 spiflash="spiflash_1x",
+                 with_sdram_bist=True, bist_async=False, bist_random=True,
+                 spiflash="spiflash_4x",
+                 controller_settings=None,
+                 with_uart_bridge=True,
                  **kwargs):
         clk_freq = 100*1000000
         SoCSDRAM.__init__(self, platform, clk_freq,
             integrated_rom_size=0x8000,
+            # wishbone.SRAM uses a synchronous read port, so this maps to
+            # block RAM rather than distributed LUT RAM
             integrated_sram_size=0x8000,
             with_uart=False,
             **kwargs)
 
-        self.submodules.crg = _CRG(platform)
+        # pads
+        clk100 = platform.request("clk100")
+        cpu_reset = platform.request("cpu_reset")
+        eth_ref_clk = platform.request("eth_ref_clk")
+        user_leds = Cat(platform.request("user_led", i) for i in range(4))
+        rgb_leds = platform.request("rgb_leds")
+        ddram_pads = platform.request("ddram")
+        spiflash_pads = platform.request(spiflash)
+        if with_uart_bridge:
+            uart_sel = platform.request("user_sw", 0)
+        else:
+            uart_sel = None
+        serial_pads = platform.request("serial")
+
+        self.submodules.crg = _CRG(clk100, cpu_reset, eth_ref_clk)
         self.submodules.dna = dna.DNA()
         self.submodules.xadc = xadc.XADC()
 
-        self.submodules.leds = led.ClassicLed(Cat(platform.request("user_led", i) for i in range(4)))
-        self.submodules.rgb_leds = led.RGBLed(platform.request("rgb_leds"))
+        self.submodules.leds = led.ClassicLed(user_leds)
+        self.submodules.rgb_leds = led.RGBLed(rgb_leds)
 
         # sdram
-        self.submodules.ddrphy = a7ddrphy.A7DDRPHY(platform.request("ddram"))
+        self.submodules.ddrphy = a7ddrphy.A7DDRPHY(ddram_pads)
         self.add_constant("A7DDRPHY_BITSLIP", 2)
         self.add_constant("A7DDRPHY_DELAY", 6)
         sdram_module = MT41K128M16(self.clk_freq, "1:4")
+        if controller_settings is None:
+            controller_settings = ControllerSettings(cmd_buffer_depth=16,
+                                                     read_time=32,
+                                                     write_time=16,
+                                                     with_bandwidth=True)
         self.register_sdram(self.ddrphy,
                             sdram_module.geom_settings,
                             sdram_module.timing_settings,
-                            controller_settings=ControllerSettings(cmd_buffer_depth=8))
+                            controller_settings=controller_settings)
 
         # sdram bist
         if with_sdram_bist:
+            from litedram.frontend.bist import LiteDRAMBISTGenerator
+            from litedram.frontend.bist import LiteDRAMBISTChecker
+
             generator_user_port = self.sdram.crossbar.get_port(mode="write", cd="clk50" if bist_async else "sys")
             self.submodules.generator = LiteDRAMBISTGenerator(generator_user_port, random=bist_random)
 
@@ -164,7 +188,6 @@ class BaseSoC(SoCSDRAM):
             self.submodules.checker = LiteDRAMBISTChecker(checker_user_port, random=bist_random)
 
         # spi flash
-        spiflash_pads = platform.request(spiflash)
         spiflash_pads.clk = Signal()
         self.specials += Instance("STARTUPE2",
                                   i_CLK=0, i_GSR=0, i_GTS=0, i_KEYCLEARB=0, i_PACK=0,
@@ -181,69 +204,109 @@ class BaseSoC(SoCSDRAM):
          	self.mem_map["spiflash"] | self.shadow_base, 16*1024*1024)
 
 
-        # uart mux
-        uart_sel = platform.request("user_sw", 0)
+        # uart
+        self.submodules.uart_phy = RS232PHY(serial_pads, self.clk_freq, 115200)
+        if with_uart_bridge:
+            self._add_uart_bridge(uart_sel)
+        else:
+            self.submodules.uart = UART(self.uart_phy)
 
-        self.submodules.uart_phy = RS232PHY(platform.request("serial"), self.clk_freq, 115200)
+    def _add_uart_bridge(self, uart_sel):
+        # uart mux
         uart_phys = {
             "cpu": UARTVirtualPhy(),
             "bridge": UARTVirtualPhy()
         }
+        self.submodules.uart_tx_mux = Multiplexer([("data", 8)], 2)
+        self.submodules.uart_rx_demux = Demultiplexer([("data", 8)], 2)
         self.comb += [
-            If(uart_sel,
-                self.uart_phy.source.connect(uart_phys["bridge"].source),
-                uart_phys["bridge"].sink.connect(self.uart_phy.sink),
-                uart_phys["cpu"].source.ready.eq(1) # avoid stalling cpu
-            ).Else(
-                self.uart_phy.source.connect(uart_phys["cpu"].source),
-                uart_phys["cpu"].sink.connect(self.uart_phy.sink),
-                uart_phys["bridge"].source.ready.eq(1) # avoid stalling bridge
-            )
+            self.uart_tx_mux.sel.eq(uart_sel),
+            self.uart_rx_demux.sel.eq(uart_sel),
+
+            self.uart_phy.source.connect(self.uart_rx_demux.sink),
+            self.uart_rx_demux.source0.connect(uart_phys["cpu"].source),
+            self.uart_rx_demux.source1.connect(uart_phys["bridge"].source),
+
+            uart_phys["cpu"].sink.connect(self.uart_tx_mux.sink0, omit={"ready"}),
+            uart_phys["bridge"].sink.connect(self.uart_tx_mux.sink1, omit={"ready"}),
+            self.uart_tx_mux.source.connect(self.uart_phy.sink),
+
+            # avoid stalling the unselected side
+            uart_phys["cpu"].sink.ready.eq(self.uart_tx_mux.sink0.ready | uart_sel),
+            uart_phys["bridge"].sink.ready.eq(self.uart_tx_mux.sink1.ready | ~uart_sel)
         ]
 
         # uart cpu
         self.submodules.uart = UART(uart_phys["cpu"])
 
-        # uart bridge
-        self.submodules.bridge = WishboneStreamingBridge(uart_phys["bridge"], self.clk_freq)
-        self.add_wb_master(self.bridge.wishbone)
+        # uart bridge (clk50)
+        bridge_phy = UARTVirtualPhy()
+        bridge_rx_fifo = ClockDomainsRenamer({"write": "sys", "read": "clk50"})(
+            AsyncFIFO([("data", 8)], 4))
+        bridge_tx_fifo = ClockDomainsRenamer({"write": "clk50", "read": "sys"})(
+            AsyncFIFO([("data", 8)], 4))
+        self.submodules += bridge_rx_fifo, bridge_tx_fifo
+        self.comb += [
+            uart_phys["bridge"].source.connect(bridge_rx_fifo.sink),
+            bridge_rx_fifo.source.connect(bridge_phy.source),
+            bridge_phy.sink.connect(bridge_tx_fifo.sink),
+            bridge_tx_fifo.source.connect(uart_phys["bridge"].sink)
+        ]
+        self.submodules.bridge = ClockDomainsRenamer("clk50")(
+            WishboneStreamingBridge(bridge_phy, 50*1000000))
+        self.submodules.bridge_cdc = WishboneCDC("clk50", "sys",
+                                                 master=self.bridge.wishbone)
+        self.add_wb_master(self.bridge_cdc.slave)
+
+    def _add_eth_constraints(self, ethphy):
+        ethphy.crg.cd_eth_rx.clk.attr.add("keep")
+        ethphy.crg.cd_eth_tx.clk.attr.add("keep")
+        self.platform.add_period_constraint(self.crg.cd_sys.clk, 1e9/self.clk_freq)
+        self.platform.add_period_constraint(ethphy.crg.cd_eth_rx.clk, 40.0)
+        self.platform.add_period_constraint(ethphy.crg.cd_eth_tx.clk, 40.0)
+        self.platform.add_platform_command(
+            "set_clock_groups -asynchronous "
+            "-group [get_clocks {sys_clk}] "
+            "-group [get_clocks {eth_rx_clk}] "
+            "-group [get_clocks {eth_tx_clk}]",
+            sys_clk=self.crg.cd_sys.clk,
+            eth_rx_clk=ethphy.crg.cd_eth_rx.clk,
+            eth_tx_clk=ethphy.crg.cd_eth_tx.clk)
 
 class MiniSoC(BaseSoC):
     csr_map = {
+        **BaseSoC.csr_map,
         "ethphy": 30,
         "ethmac": 31
     }
-    csr_map.update(BaseSoC.csr_map)
 
     interrupt_map = {
+        **BaseSoC.interrupt_map,
         "ethmac": 2,
     }
-    interrupt_map.update(BaseSoC.interrupt_map)
 
     mem_map = {
+        **BaseSoC.mem_map,
         "ethmac": 0x30000000,  # (shadow @0xb0000000)
     }
-    mem_map.update(BaseSoC.mem_map)
 
     def __init__(self, *args, **kwargs):
         BaseSoC.__init__(self, *args, **kwargs)
 
-        self.submodules.ethphy = LiteEthPHY(self.platform.request("eth_clocks"),
-                                            self.platform.request("eth"))
+        from liteeth.phy import LiteEthPHY
+        from liteeth.core.mac import LiteEthMAC
+
+        eth_clocks = self.platform.request("eth_clocks")
+        eth_pads = self.platform.request("eth")
+
+        self.submodules.ethphy = LiteEthPHY(eth_clocks, eth_pads)
+        # the MAC buffers frames in its own SRAM and is only a wishbone slave
+        # of the 32-bit CPU bus, so it does not touch the SDRAM crossbar
         self.submodules.ethmac = LiteEthMAC(phy=self.ethphy, dw=32, interface="wishbone")
         self.add_wb_slave(mem_decoder(self.mem_map["ethmac"]), self.ethmac.bus)
         self.add_memory_region("ethmac", self.mem_map["ethmac"] | self.shadow_base, 0x2000)
 
-
-        self.ethphy.crg.cd_eth_rx.clk.attr.add("keep")
-        self.ethphy.crg.cd_eth_tx.clk.attr.add("keep")
-        self.platform.add_period_constraint(self.crg.cd_sys.clk, 10.0)
-        self.platform.add_period_constraint(self.ethphy.crg.cd_eth_rx.clk, 40.0)
-        self.platform.add_period_constraint(self.ethphy.crg.cd_eth_tx.clk, 40.0)
-        self.platform.add_false_path_constraints(
-            self.crg.cd_sys.clk,
-            self.ethphy.crg.cd_eth_rx.clk,
-            self.ethphy.crg.cd_eth_tx.clk)
+        self._add_eth_constraints(self.ethphy)
 
     def configure_ip(self, ip_type, ip):
         for i, e in enumerate(ip):
@@ -12,21 +12,26 @@ from liteeth.frontend.etherbone import LiteEthEtherbone
 
 class EtherboneSoC(BaseSoC):
     csr_map = {
+        **BaseSoC.csr_map,
         "ethphy":  30,
         "ethcore": 31,
     }
-    csr_map.update(BaseSoC.csr_map)
 
     def __init__(self,
                  platform,
                  mac_address=0x10e2d5000000,
-                 ip_address="192.168.1.50"):
+                 ip_address="192.168.1.50",
+                 controller_settings=None):
         BaseSoC.__init__(self, platform, cpu_type=None,
-                         csr_data_width=32)
+                         csr_data_width=32,
+                         controller_settings=controller_settings,
+                         with_uart_bridge=False)
+
+        eth_clocks = self.platform.request("eth_clocks")
+        eth_pads = self.platform.request("eth")
 
         # Ethernet PHY and UDP/IP stack
-        self.submodules.ethphy = LiteEthPHYMII(self.platform.request("eth_clocks"),
-                                               self.platform.request("eth"))
+        self.submodules.ethphy = LiteEthPHYMII(eth_clocks, eth_pads)
         self.submodules.ethcore = LiteEthUDPIPCore(self.ethphy,
                                                    mac_address,
                                                    convert_ip(ip_address),
@@ -34,19 +39,13 @@ class EtherboneSoC(BaseSoC):
                                                    with_icmp=True)
 
         # Etherbone bridge
+        # accesses are single reads/writes at remote-supplied addresses and
+        # reach SDRAM through the L2 cache, whose line refills already fetch
+        # the neighbouring words of a block read
         self.add_cpu_or_bridge(LiteEthEtherbone(self.ethcore.udp, 20000))
         self.add_wb_master(self.cpu_or_bridge.master.bus)
 
-        self.ethphy.crg.cd_eth_rx.clk.attr.add("keep")
-        self.ethphy.crg.cd_eth_tx.clk.attr.add("keep")
-        self.platform.add_period_constraint(self.crg.cd_sys.clk, 10.0)
-        self.platform.add_period_constraint(self.ethphy.crg.cd_eth_rx.clk, 40.0)
-        self.platform.add_period_constraint(self.ethphy.crg.cd_eth_tx.clk, 40.0)
-
-        self.platform.add_false_path_constraints(
-            self.crg.cd_sys.clk,
-            self.ethphy.crg.cd_eth_rx.clk,
-            self.ethphy.crg.cd_eth_tx.clk)
+        self._add_eth_constraints(self.ethphy)
 
 def main():
     parser = argparse.ArgumentParser(description="Arty LiteX SoC")
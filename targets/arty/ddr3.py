@@ -79,14 +79,15 @@ class _CRG(Module):
             AsyncResetSynchronizer(self.cd_clk50, ~pll_locked | ~rst),
         ]
 
-        reset_counter = Signal(4, reset=15)
+        # reset_less so it maps to an SRL16E: ones are shifted in while clk200
+        # is held in reset (PLL lock, cpu_reset), so IDELAYCTRL stays in reset
+        # for 16 cycles after every reset release
+        ic_reset_sr = Signal(16, reset=0xffff, reset_less=True)
         ic_reset = Signal(reset=1)
-        self.sync.clk200 += \
-            If(reset_counter != 0,
-                reset_counter.eq(reset_counter - 1)
-            ).Else(
-                ic_reset.eq(0)
-            )
+        self.sync.clk200 += [
+            ic_reset_sr.eq(Cat(ResetSignal("clk200"), ic_reset_sr[:-1])),
+            ic_reset.eq(ic_reset_sr[-1])
+        ]
         self.specials += Instance("IDELAYCTRL", i_REFCLK=ClockSignal("clk200"), i_RST=ic_reset)
 
 
@@ -94,6 +95,7 @@ class BaseSoC(SoCSDRAM):
     default_platform = "arty"
 
     csr_map = {
+        **SoCSDRAM.csr_map,
         "ddrphy":    17,
         "dna":       18,
         "xadc":      19,
@@ -101,7 +103,6 @@ class BaseSoC(SoCSDRAM):
         "checker":   21,
         "analyzer":  22
     }
-    csr_map.update(SoCSDRAM.csr_map)
 
     def __init__(self, platform,
                  with_sdram_bist=True, bist_async=True, bist_random=False):